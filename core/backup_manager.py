@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
 import os
+import shutil
+import subprocess
 import threading
 import time
 from datetime import datetime, timedelta
 import tarfile
 
+COPY_BUFSIZE = 2 * 1024 * 1024  # per-member copy buffer (tarfile default is 16 KiB)
+OUTPUT_BUFSIZE = 1024 * 1024    # coalesces tar's 512-byte header/padding writes
+COMPRESS_LEVEL = 6              # gzip default; ~2x faster than 9 at near-identical ratio on logs
+DIFF_SUFFIX = "-diff"           # marks archives holding only changes since the last full
+LAST_BACKUP_FILE = ".last_backup"
+
 class BackupManager:
     """
     Automates periodic backups of a directory and prunes old backups.
@@ -13,75 +21,201 @@ class BackupManager:
     - backup_dir: where to store archives (e.g. "backups")
     - retention_days: how many days to keep backups
     - interval_hours: how often to run a backup (default: 24h)
+    - full_backup_every: every Nth run is a full backup; the runs in between
+      only archive files changed since that full (default: 7)
     """
     def __init__(self,
                  source_dir="logs",
                  backup_dir="backups",
                  retention_days=5,
-                 interval_hours=24):
+                 interval_hours=24,
+                 full_backup_every=7):
         self.source_dir = source_dir
         self.backup_dir = backup_dir
         self.retention_days = retention_days
         self.interval = interval_hours * 3600  # in seconds
+        self.full_backup_every = max(1, full_backup_every)
 
         os.makedirs(self.source_dir, exist_ok=True)
         os.makedirs(self.backup_dir, exist_ok=True)
 
         self._lock = threading.Lock()
-        self._running = False
+        self._stop = threading.Event()
         self._thread = None
+        self._runs = 0  # first run after start-up is always a full backup
 
     def start(self):
         """Begin background backup loop."""
-        if not self._running:
-            self._running = True
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
             self._thread = threading.Thread(target=self._backup_loop, daemon=True)
             self._thread.start()
 
     def stop(self):
         """Stop background backup loop."""
-        self._running = False
+        self._stop.set()
         if self._thread:
             self._thread.join()
 
     def _backup_loop(self):
-        """Internal loop: backup + prune, then sleep."""
-        while self._running:
-            self.backup_once()
-            time.sleep(self.interval)
+        """Internal loop: backup + prune, then wait (wakes early on stop())."""
+        while not self._stop.is_set():
+            try:
+                self.backup_once()
+            except Exception as e:
+                # One failed run must not end the thread; retry next interval
+                print(f"[ERROR] Backup failed: {e}")
+            if self._stop.wait(self.interval):
+                break
 
     def backup_once(self):
-        """Perform a single backup + prune old archives."""
+        """Perform a single (full or differential) backup + prune old archives."""
         with self._lock:
-            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            archive_name = f"backup-{timestamp}.tar.gz"
-            archive_path = os.path.join(self.backup_dir, archive_name)
-
-            # Create tar.gz archive of source_dir
-            with tarfile.open(archive_path, "w:gz") as tar:
-                tar.add(self.source_dir, arcname=os.path.basename(self.source_dir))
-            print(f"[BACKUP] Created archive: {archive_name}")
+            since = None
+            if self._runs % self.full_backup_every:
+                since = self._read_last_mtime()  # None → no full on record, do one
+            self._runs += 1
+
+            changed, newest = self._scan_source(since)
+            if since is None:
+                # Full: archive the whole directory (keeps empty subdirs too)
+                members = [os.path.basename(os.path.abspath(self.source_dir))]
+                suffix, kind = "", "full"
+            else:
+                members = changed
+                suffix, kind = DIFF_SUFFIX, "differential"
+
+            if members:
+                timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+                archive_name = f"backup-{timestamp}{suffix}.tar.gz"
+                archive_path = os.path.join(self.backup_dir, archive_name)
+
+                # Create tar.gz archive of source_dir (parallel gzip when available)
+                pigz = shutil.which("pigz")
+                if pigz:
+                    self._archive_with_pigz(pigz, archive_path, members)
+                else:
+                    self._archive_with_tarfile(archive_path, members)
+                print(f"[BACKUP] Created {kind} archive: {archive_name}")
+
+                if since is None:
+                    self._write_last_mtime(newest)
+            else:
+                print("[BACKUP] No changes since last full backup; skipped.")
 
             # Prune old backups
             self._prune_old_backups()
 
+    def _scan_source(self, since):
+        """
+        Walk source_dir once. Returns (files with mtime > `since`, relative to
+        source_dir's parent, and the newest mtime seen).
+        """
+        root = os.path.abspath(self.source_dir)
+        parent = os.path.dirname(root)
+        changed = []
+        newest = 0.0
+        stack = [root]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    try:
+                        mtime = entry.stat(follow_symlinks=False).st_mtime
+                    except FileNotFoundError:
+                        continue
+                    newest = max(newest, mtime)
+                    if since is None or mtime > since:
+                        changed.append(os.path.relpath(entry.path, parent))
+        return changed, newest
+
+    def _read_last_mtime(self):
+        """Newest source mtime captured by the last full backup, or None."""
+        try:
+            with open(os.path.join(self.backup_dir, LAST_BACKUP_FILE)) as f:
+                return float(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _write_last_mtime(self, mtime):
+        path = os.path.join(self.backup_dir, LAST_BACKUP_FILE)
+        with open(path + ".tmp", "w") as f:
+            f.write(repr(mtime))
+        os.replace(path + ".tmp", path)
+
+    def _archive_with_tarfile(self, archive_path, members):
+        """Write the archive in-process with tarfile (single-threaded gzip)."""
+        parent = os.path.dirname(os.path.abspath(self.source_dir))
+        try:
+            with open(archive_path, "wb", buffering=OUTPUT_BUFSIZE) as out, \
+                 tarfile.open(fileobj=out, mode="w:gz",
+                              compresslevel=COMPRESS_LEVEL,
+                              copybufsize=COPY_BUFSIZE) as tar:
+                for member in members:
+                    try:
+                        tar.add(os.path.join(parent, member), arcname=member)
+                    except FileNotFoundError:
+                        # Removed or rotated away since the scan; nothing to keep
+                        print(f"[WARNING] Skipped vanished file: {member}")
+        except BaseException:
+            # A partial archive would be taken for the newest full by pruning
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
+            raise
+
+    def _archive_with_pigz(self, pigz, archive_path, members):
+        """Pipe `tar -cf -` into pigz so compression uses every core."""
+        parent = os.path.dirname(os.path.abspath(self.source_dir))
+        with open(archive_path, "wb") as out:
+            # Member names go in on stdin so long change lists don't hit ARG_MAX
+            tar = subprocess.Popen(
+                ["tar", "-C", parent, "--null", "-T", "-", "-cf", "-"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE
+            )
+            gz = subprocess.Popen([pigz, f"-{COMPRESS_LEVEL}"], stdin=tar.stdout, stdout=out)
+            tar.stdout.close()  # let tar see SIGPIPE if pigz dies
+            try:
+                tar.stdin.write(b"".join(os.fsencode(m) + b"\0" for m in members))
+                tar.stdin.close()
+            except BrokenPipeError:
+                pass  # tar exited early; its return code reports why
+            gz_rc = gz.wait()
+            tar_rc = tar.wait()
+
+        # tar exits 1 when a file changed while being read (Logger appends to
+        # source_dir constantly); the archive is still complete, so keep it.
+        if tar_rc == 1 and not gz_rc:
+            print(f"[WARNING] tar reported files changed during backup: "
+                  f"{os.path.basename(archive_path)}")
+        elif tar_rc or gz_rc:
+            os.remove(archive_path)
+            failed = "tar" if tar_rc else "pigz"
+            raise subprocess.CalledProcessError(tar_rc or gz_rc, failed)
+
     def _prune_old_backups(self):
-        """Delete backup files older than retention_days."""
-        cutoff = datetime.now() - timedelta(days=self.retention_days)
-        for fname in os.listdir(self.backup_dir):
-            if not fname.startswith("backup-") or not fname.endswith(".tar.gz"):
+        """Delete backup files older than retention_days (never the newest full)."""
+        cutoff_ts = (datetime.now() - timedelta(days=self.retention_days)).timestamp()
+        with os.scandir(self.backup_dir) as it:
+            archives = [e for e in it
+                        if e.name.startswith("backup-") and e.name.endswith(".tar.gz")]
+
+        # Later differentials are only restorable on top of the newest full
+        newest_full = max((e.name for e in archives
+                           if not e.name.endswith(DIFF_SUFFIX + ".tar.gz")), default=None)
+
+        for entry in archives:
+            if entry.name == newest_full:
                 continue
-            date_part = fname[len("backup-"):-len(".tar.gz")]
+            # An archive's mtime is its creation time, so no need to parse the name
             try:
-                file_date = datetime.strptime(date_part, "%Y%m%d-%H%M%S")
-            except ValueError:
+                if entry.stat().st_mtime >= cutoff_ts:
+                    continue
+            except FileNotFoundError:
                 continue
-
-            if file_date < cutoff:
-                path = os.path.join(self.backup_dir, fname)
-                os.remove(path)
-                print(f"[PRUNE] Removed old backup: {fname}")
-
+            os.remove(entry.path)
+            print(f"[PRUNE] Removed old backup: {entry.name}")
 
 if __name__ == "__main__":
     # --- Simple smoke test ---
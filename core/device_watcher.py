@@ -147,7 +147,6 @@
 
 
 import os
-import time
 import platform
 import subprocess
 import threading
@@ -162,12 +161,45 @@ from PIL import Image, ImageDraw
 ALLOWED_INTERFACES = {'Wi-Fi'}
 LOG_FILE = "blocked_devices.log"
 SOUND_FILE = "assets/alert.wav"  # Replace with your custom sound path
+SCAN_INTERVAL = 5  # seconds between interface scans
+
+# Resolved once; platform.system() hits uname / the registry on every call
+_OS = platform.system().lower()
+_IS_WIN = _OS == 'windows'
+_IS_LIN = _OS == 'linux'
+
+# Fixed command prefixes; only the interface name is appended per call
+_LIN_LINK_DOWN = ('ip', 'link', 'set')
+_WIN_IFACE_DISABLE = ('netsh', 'interface', 'set', 'interface')
+
+_SOUND_PRESENT = os.path.exists(SOUND_FILE)
+_WAVE = None  # simpleaudio.WaveObject decoded once at import (non-Windows)
+
+def _preload_sound():
+    global _WAVE
+    if not _SOUND_PRESENT or _IS_WIN:
+        return
+    try:
+        import simpleaudio
+        _WAVE = simpleaudio.WaveObject.from_wave_file(SOUND_FILE)
+    except Exception:
+        _WAVE = None  # simpleaudio missing or file not PCM WAV; use playsound
+
+_preload_sound()
+
+def _playsound_blocking():
+    """Fallback player, run on its own thread so alerts never wait on it."""
+    try:
+        playsound(SOUND_FILE)
+    except Exception as e:
+        print(f"[Sound Error] {e}")
 
 class DeviceWatcher:
     def __init__(self, allowed_ifaces):
         self.allowed_ifaces = allowed_ifaces
-        self.known_ifaces = set(self._get_wifi_interfaces())
-        self.os_type = platform.system().lower()
+        self.os_type = _OS
+        self.known_ifaces = self._get_wifi_interfaces()
+        self._stop = threading.Event()
         print(f"[DeviceWatcher] Started ({self.os_type}); allowed_ifaces={self.allowed_ifaces}")
         self._create_log_file()
 
@@ -177,12 +209,21 @@ class DeviceWatcher:
                 f.write("=== Blocked Devices Log ===\n")
 
     def _get_wifi_interfaces(self):
-        """Detect current Wi-Fi interfaces using psutil."""
-        ifaces = []
-        for name, snics in psutil.net_if_addrs().items():
-            if 'wi-fi' in name.lower() or 'wlan' in name.lower():
-                ifaces.append(name)
-        return ifaces
+        """Detect current Wi-Fi interfaces as a frozenset of names."""
+        if _IS_LIN:
+            # sysfs marks wireless NICs with a `wireless` subdir; no address lookup needed
+            try:
+                return frozenset(
+                    n for n in os.listdir('/sys/class/net')
+                    if os.path.isdir(f'/sys/class/net/{n}/wireless')
+                )
+            except OSError:
+                pass
+        # net_if_stats() skips the per-address enumeration net_if_addrs() does
+        return frozenset(
+            n for n in psutil.net_if_stats()
+            if 'wi-fi' in n.lower() or 'wlan' in n.lower()
+        )
 
     def _log_blocked_device(self, iface):
         with open(LOG_FILE, 'a') as f:
@@ -196,19 +237,29 @@ class DeviceWatcher:
         )
 
     def _play_sound(self):
+        """Start the alert sound without blocking the block/notify path."""
+        if not _SOUND_PRESENT:
+            return
         try:
-            if os.path.exists(SOUND_FILE):
-                playsound(SOUND_FILE)
+            if _IS_WIN:
+                import winsound
+                winsound.PlaySound(SOUND_FILE, winsound.SND_ASYNC | winsound.SND_FILENAME
+                                   | winsound.SND_NODEFAULT)
+            elif _WAVE is not None:
+                _WAVE.play()
+            else:
+                # playsound's block=False is unimplemented on Linux; thread it instead
+                threading.Thread(target=_playsound_blocking, daemon=True).start()
         except Exception as e:
             print(f"[Sound Error] {e}")
 
     def _block_iface(self, iface):
         try:
-            if self.os_type == 'linux':
-                subprocess.run(['ip', 'link', 'set', iface, 'down'], check=True)
-            elif self.os_type == 'windows':
+            if _IS_LIN:
+                subprocess.run([*_LIN_LINK_DOWN, iface, 'down'], check=True)
+            elif _IS_WIN:
                 subprocess.run(
-                    ['netsh', 'interface', 'set', 'interface', iface, 'admin=disable'],
+                    [*_WIN_IFACE_DISABLE, iface, 'admin=disable'],
                     check=True, shell=True
                 )
             msg = f"[BLOCK] {datetime.now().isoformat()} - Blocked external Wi‑Fi device: {iface}"
@@ -223,8 +274,8 @@ class DeviceWatcher:
 
     def monitor(self):
         print("DeviceWatcher is running. Plug in or enable a new Wi‑Fi adapter to test.")
-        while True:
-            current = set(self._get_wifi_interfaces())
+        while not self._stop.is_set():
+            current = self._get_wifi_interfaces()
             new = current - self.known_ifaces
 
             for iface in new:
@@ -232,12 +283,18 @@ class DeviceWatcher:
                     self._block_iface(iface)
 
             self.known_ifaces = current
-            time.sleep(5)
+            if self._stop.wait(SCAN_INTERVAL):
+                break
+
+    def stop(self):
+        """Wake `monitor()` immediately and make it return."""
+        self._stop.set()
 
 # GUI Tray Icon
-def create_tray_icon():
+def create_tray_icon(watcher):
     def on_exit(icon, item):
         print("Shutting down Firewall gAmA Device Watcher.")
+        watcher.stop()
         icon.stop()
 
     image = Image.new('RGB', (64, 64), color='red')
@@ -250,9 +307,9 @@ def create_tray_icon():
     threading.Thread(target=icon.run, daemon=True).start()
 
 if __name__ == "__main__":
-    create_tray_icon()
-
     watcher = DeviceWatcher(ALLOWED_INTERFACES)
+    create_tray_icon(watcher)
+
     try:
         watcher.monitor()
     except KeyboardInterrupt:
@@ -4,10 +4,12 @@ import time
 import threading
 import subprocess
 import platform
+import tempfile
 import re
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
-from scapy.all import sniff, conf, IP
+from scapy.all import AsyncSniffer, conf, IP
 from plyer import notification
 from playsound import playsound
 import pystray
@@ -19,12 +21,41 @@ IDLE_TIMEOUT    = 10          # seconds for testing (set to 3600 for 1 hour)
 CHECK_INTERVAL  = 5           # seconds between idle‐checks
 LOG_FILE        = "inactivity_log.log"
 SOUND_FILE      = "assets/idle_alert.wav"
+# Drop multicast/broadcast in the kernel so they never reach packet_handler
+SNIFF_FILTER    = "ip and not (dst net 224.0.0.0/4 or dst host 255.255.255.255)"
 AGGRESSIVE_MODE = True        # True to block at host‐firewall, False = safe mode
+EVICT_AFTER     = 2 * IDLE_TIMEOUT   # forget IPs silent this long (already flagged by then)
+FLAG_TTL        = 24 * 3600   # re-alert a device that is still idle at most once per day
+
+# ─── Platform ─────────────────────────────────────────────────────────────────
+
+_OS     = platform.system().lower()   # resolved once; platform.system() hits uname
+_IS_WIN = _OS == "windows"
+_IS_LIN = _OS == "linux"
+
+# Per-IP rule lines; block_ips() wraps all of a tick's IPs into one script so a
+# whole batch costs a single process spawn
+_NETSH_BLOCK_RULES = (
+    'add rule name="Firewall gAmA block {ip}" dir=in  action=block remoteip={ip}\n'
+    'add rule name="Firewall gAmA block {ip}" dir=out action=block remoteip={ip}\n'
+)
+_IPT_BLOCK_RULES = (
+    "-I INPUT -s {ip} -j DROP\n"
+    "-I OUTPUT -d {ip} -j DROP\n"
+)
 
 # ─── Globals ──────────────────────────────────────────────────────────────────
 
-last_activity = {}   # IP → datetime of last seen packet or seed time
+# IP → time.monotonic() of last seen packet or seed time, least recent first
+last_activity = OrderedDict()
+# Shared by the sniffer thread and idle_checker(); guards every last_activity access
+_activity_lock = threading.Lock()
+# IP → time.monotonic() it was flagged idle, oldest first; dedups alerts for FLAG_TTL
+flagged_ips   = OrderedDict()
+# IPs with rules in the host firewall, so they are never blocked twice. Only
+# IPs confirmed by block_ips() are added here, so it can't outgrow the rule table itself.
 blocked_ips   = set()
+STOP          = threading.Event()   # set to end idle_checker() promptly
 
 # ─── Helpers ──────────────────────────────────────────────────────────────────
 
@@ -39,61 +70,132 @@ def log(msg: str):
 def notify(title: str, message: str):
     notification.notify(title=title, message=message, timeout=5)
 
-def play_sound():
-    if os.path.exists(SOUND_FILE):
-        try:
-            playsound(SOUND_FILE)
-        except Exception as e:
-            print(f"[Sound Error] {e}")
+_SOUND_PRESENT = os.path.exists(SOUND_FILE)
+_WAVE = None   # simpleaudio.WaveObject decoded once at import (non-Windows)
 
-def block_ip(ip: str):
-    """Block `ip` at the host firewall."""
-    os_type = platform.system().lower()
+def _preload_sound():
+    global _WAVE
+    if not _SOUND_PRESENT or _IS_WIN:
+        return
     try:
-        if os_type == "windows":
-            # inbound
-            subprocess.run([
-                "netsh", "advfirewall", "firewall", "add", "rule",
-                f"name=Firewall gAmA block {ip}",
-                "dir=in", "action=block", f"remoteip={ip}"
-            ], check=True, shell=True)
-            # outbound
-            subprocess.run([
-                "netsh", "advfirewall", "firewall", "add", "rule",
-                f"name=Firewall gAmA block {ip}",
-                "dir=out", "action=block", f"remoteip={ip}"
-            ], check=True, shell=True)
-
-        elif os_type == "linux":
-            subprocess.run(["iptables", "-I", "INPUT",  "-s", ip, "-j", "DROP"],  check=True)
-            subprocess.run(["iptables", "-I", "OUTPUT", "-d", ip, "-j", "DROP"],  check=True)
+        import simpleaudio
+        _WAVE = simpleaudio.WaveObject.from_wave_file(SOUND_FILE)
+    except Exception:
+        _WAVE = None   # simpleaudio missing or file not PCM WAV; use playsound
 
-        log(f"🔒 Blocked IP {ip} at host firewall")
+_preload_sound()
+
+def _playsound_blocking():
+    """Fallback player, run on its own thread so alerts never wait on it."""
+    try:
+        playsound(SOUND_FILE)
     except Exception as e:
-        log(f"[ERROR] Failed to block {ip}: {e}")
+        print(f"[Sound Error] {e}")
+
+def play_sound():
+    """Start the alert sound without blocking the caller."""
+    if not _SOUND_PRESENT:
+        return
+    try:
+        if _IS_WIN:
+            import winsound
+            winsound.PlaySound(SOUND_FILE, winsound.SND_ASYNC | winsound.SND_FILENAME
+                               | winsound.SND_NODEFAULT)
+        elif _WAVE is not None:
+            _WAVE.play()
+        else:
+            # playsound's block=False is unimplemented on Linux; thread it instead
+            threading.Thread(target=_playsound_blocking, daemon=True).start()
+    except Exception as e:
+        print(f"[Sound Error] {e}")
+
+def _apply_block_rules(ips: list):
+    """Insert in+out block rules for every IP in `ips` with one firewall process."""
+    if _IS_WIN:
+        script = ("pushd advfirewall firewall\n"
+                  + "".join(_NETSH_BLOCK_RULES.format(ip=ip) for ip in ips)
+                  + "popd\n")
+        with tempfile.NamedTemporaryFile("w", suffix=".netsh", delete=False) as f:
+            f.write(script)
+        try:
+            subprocess.run(["netsh", "-f", f.name], check=True)
+        finally:
+            os.unlink(f.name)
+
+    elif _IS_LIN:
+        # One COMMIT under one xtables lock; check=True so a rejected
+        # COMMIT is reported, not logged as blocked
+        rules = ("*filter\n"
+                 + "".join(_IPT_BLOCK_RULES.format(ip=ip) for ip in ips)
+                 + "COMMIT\n")
+        subprocess.run(["iptables-restore", "--noflush"], input=rules, text=True, check=True)
+
+def block_ips(ips: list) -> set:
+    """Block `ips` at the host firewall. Returns the IPs whose rules are in."""
+    if not ips:
+        return set()
+    try:
+        _apply_block_rules(ips)
+    except Exception as e:
+        if len(ips) == 1:
+            log(f"[ERROR] Failed to block {ips[0]}: {e}")
+            return set()
+        # The batch is all-or-nothing; retry singly so one bad rule can't sink the rest
+        log(f"[ERROR] Batch block of {len(ips)} IPs failed ({e}); retrying individually")
+        return set().union(*(block_ips([ip]) for ip in ips))
+
+    for ip in ips:
+        log(f"🔒 Blocked IP {ip} at host firewall")
+    return set(ips)
 
 # ─── Packet Sniffer ───────────────────────────────────────────────────────────
 
 def packet_handler(pkt):
-    if IP in pkt:
-        now = datetime.now()
-        for addr in (pkt[IP].src, pkt[IP].dst):
-            last_activity[addr] = now
+    ip = pkt.getlayer(IP)
+    if ip is not None:
+        now = time.monotonic()
+        with _activity_lock:
+            for addr in (ip.src, ip.dst):
+                # pop + insert moves addr to the newest end without a KeyError window
+                last_activity.pop(addr, None)
+                last_activity[addr] = now
 
 def start_sniffer():
+    """Start a background AsyncSniffer and return it (call .stop() to end)."""
     iface = conf.iface
     log(f"Starting packet sniffer on interface: {iface}")
-    sniff(prn=packet_handler, store=False, filter="ip", iface=iface)
+    sniffer = AsyncSniffer(prn=packet_handler, store=False, filter=SNIFF_FILTER, iface=iface)
+    sniffer.start()
+    return sniffer
 
 # ─── ARP Discovery & Idle Checker ─────────────────────────────────────────────
 
+_IP_RE = re.compile(r"\d+\.\d+\.\d+\.\d+$")
+
+def _read_proc_arp():
+    """Return IPs from the kernel ARP table, or None if it can't be read."""
+    try:
+        with open("/proc/net/arp", "r") as f:
+            next(f, None)  # skip header
+            return {
+                ip for ip in (line.split(None, 1)[0] for line in f if line.strip())
+                if _IP_RE.match(ip)
+            }
+    except OSError:
+        return None
+
 def discover_devices():
     """Return a set of IPs discovered via ARP table (cross‐platform)."""
     ips = set()
-    os_type = platform.system().lower()
+
+    # Linux: read the kernel table directly instead of spawning `arp -n`
+    if _IS_LIN:
+        proc_ips = _read_proc_arp()
+        if proc_ips is not None:
+            return proc_ips
 
     try:
-        if os_type == "windows":
+        if _IS_WIN:
             out = subprocess.check_output(["arp", "-a"], text=True)
             for line in out.splitlines():
                 line = line.strip()
@@ -101,56 +203,81 @@ def discover_devices():
                     continue
                 parts = line.split()
                 ip = parts[0]
-                if re.match(r"\d+\.\d+\.\d+\.\d+", ip):
+                if _IP_RE.match(ip):
                     ips.add(ip)
         else:  # linux / mac
             out = subprocess.check_output(["arp", "-n"], text=True)
             for line in out.splitlines():
                 parts = line.split()
-                if len(parts) >= 1 and re.match(r"\d+\.\d+\.\d+\.\d+", parts[0]):
+                if parts and _IP_RE.match(parts[0]):
                     ips.add(parts[0])
     except Exception as e:
         log(f"[ERROR] ARP discovery failed: {e}")
 
     return ips
 
+def _evict_older_than(entries: OrderedDict, horizon: float):
+    """Pop entries from the oldest end; O(evicted) thanks to insertion order."""
+    while entries:
+        ip = next(iter(entries))
+        if entries[ip] >= horizon:
+            break
+        del entries[ip]
+
 def idle_checker():
-    while True:
-        now = datetime.now()
+    while not STOP.is_set():
+        now = time.monotonic()
         ips = discover_devices()
 
-        for ip in ips:
-            # skip broadcast
-            if ip == "255.255.255.255":
-                continue
+        seeded = []
+        with _activity_lock:
+            for ip in ips:
+                # skip broadcast
+                if ip == "255.255.255.255":
+                    continue
+
+                # seed new devices; flagged/firewalled ones were already reported,
+                # so an evicted one isn't re-seeded (and re-logged) every EVICT_AFTER
+                if ip not in last_activity and ip not in flagged_ips and ip not in blocked_ips:
+                    last_activity[ip] = now
+                    seeded.append(ip)
+            snapshot = list(last_activity.items())
 
-            # seed new devices
-            if ip not in last_activity:
-                last_activity[ip] = now
-                log(f"Discovered device {ip}, seeding timer")
+        for ip in seeded:
+            log(f"Discovered device {ip}, seeding timer")
 
-        for ip, last in list(last_activity.items()):
+        newly_idle = []
+        for ip, last in snapshot:
             if ip == "255.255.255.255":
                 continue
 
-            idle = (now - last).total_seconds()
-            if idle >= IDLE_TIMEOUT and ip not in blocked_ips:
+            idle = now - last
+            if idle >= IDLE_TIMEOUT and ip not in flagged_ips and ip not in blocked_ips:
                 log(f"Idle detected: {ip} (idle ≥ {IDLE_TIMEOUT}s)")
                 notify("Firewall gAmA", f"Device {ip} idle for ≥{IDLE_TIMEOUT}s")
                 play_sound()
-                if AGGRESSIVE_MODE:
-                    block_ip(ip)
-                blocked_ips.add(ip)
+                flagged_ips[ip] = now
+                newly_idle.append(ip)
 
-        time.sleep(CHECK_INTERVAL)
+        # One firewall process per tick, however many devices went idle
+        if AGGRESSIVE_MODE and newly_idle:
+            blocked_ips.update(block_ips(newly_idle))
+
+        # Bound both maps; eviction runs after the check, so nothing is
+        # dropped from last_activity before it has been flagged.
+        with _activity_lock:
+            _evict_older_than(last_activity, now - EVICT_AFTER)
+        _evict_older_than(flagged_ips, now - FLAG_TTL)  # idle_checker-only; no lock
+
+        STOP.wait(CHECK_INTERVAL)
 
 # ─── Tray Icon ────────────────────────────────────────────────────────────────
 
 def create_tray_icon():
     def on_exit(icon, item):
         log("Shutting down Inactivity Monitor.")
+        STOP.set()
         icon.stop()
-        os._exit(0)
 
     img = Image.new('RGB', (64, 64), color='red')
     d = ImageDraw.Draw(img)
@@ -169,6 +296,9 @@ if __name__ == "__main__":
             f.write("=== Inactivity Log ===\n")
 
     create_tray_icon()
-    threading.Thread(target=start_sniffer, daemon=True).start()
-    idle_checker()
+    sniffer = start_sniffer()
+    try:
+        idle_checker()
+    finally:
+        sniffer.stop()
 
@@ -1,9 +1,21 @@
 #!/usr/bin/env python3
+import atexit
 import os
+import queue
+import re
 import threading
 import time
+from collections import defaultdict
 from datetime import datetime, timedelta
 
+PRUNE_INTERVAL = 3600          # seconds between retention sweeps
+WRITE_BUFSIZE  = 64 * 1024     # per-handle write buffer
+MAX_BATCH      = 1024          # max queued entries written per flush
+
+_STOP = object()               # queue sentinel that ends the flusher thread
+# Files this logger owns: user_YYYY‑MM‑DD.log and its rotated .log.1
+_LOG_NAME_RE = re.compile(r".+_\d{4}-\d{2}-\d{2}\.log(?:\.1)?$")
+
 class Logger:
     """
     Per‑user daily logs with retention and size‑cap enforcement.
@@ -22,48 +34,160 @@ class Logger:
         self.retention_days = retention_days
         self.max_size = max_size_gb * 1024**3
         self.warning_threshold = warning_threshold
-        self._lock = threading.Lock()
 
-        os.makedirs(self.log_dir, exist_ok=True)
+        # (user, date_str) → [open append handle, bytes in file]
+        # Only touched by the flusher thread, or under _state_lock once closed.
+        self._handles = {}
+        self._last_prune = 0.0
 
-    def log(self, user: str, action: str):
-        """Log an action for `user`, prune old files, enforce size cap."""
-        with self._lock:
-            self._prune_old_logs()
-
-            path = self._user_log_path(user)
-            size = os.path.getsize(path) if os.path.exists(path) else 0
-
-            # Warning
-            if size >= self.max_size * self.warning_threshold:
-                self._warn_size(user, size)
+        os.makedirs(self.log_dir, exist_ok=True)
 
-            # Rotate if over cap
-            if size >= self.max_size:
-                self._rotate(path)
+        self._q = queue.SimpleQueue()
+        self._state_lock = threading.Lock()  # orders log() against close()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._drain, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
 
-            # Append new entry
-            timestamp = datetime.now().isoformat(sep=' ', timespec='seconds')
-            with open(path, "a") as f:
-                f.write(f"{timestamp} | {user} | {action}\n")
+    def log(self, user: str, action: str):
+        """Queue an action for `user`; the flusher thread does the I/O."""
+        with self._state_lock:
+            if not self._closed:
+                self._q.put((user, action, time.time()))
+                return
+            # Flusher is gone (close() or atexit): write through synchronously
+            self._write_batch(self._group([(user, action, time.time())]))
+            self._close_handles()
+
+    def close(self):
+        """Write out everything queued so far and close all log handles.
+
+        Later log() calls still reach disk, written synchronously.
+        """
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._q.put(_STOP)
+            self._flusher.join()
+
+    def _drain(self):
+        """Flusher loop: batch queued entries and write them per file."""
+        while True:
+            batch = [self._q.get()]
+            try:
+                while len(batch) < MAX_BATCH:
+                    batch.append(self._q.get_nowait())
+            except queue.Empty:
+                pass
+
+            stopping = _STOP in batch
+            self._write_batch(self._group(item for item in batch if item is not _STOP))
+
+            if stopping:
+                self._close_handles()
+                return
+
+    def _group(self, entries):
+        """Format (user, action, ts) entries and group the lines by target file."""
+        grouped = defaultdict(list)
+        last_sec = None
+        for user, action, ts in entries:
+            # Format each distinct second once; a batch usually spans very few
+            sec = int(ts)
+            if sec != last_sec:
+                dt = datetime.fromtimestamp(sec)
+                stamp = dt.isoformat(sep=' ', timespec='seconds')
+                date_str = dt.strftime("%Y-%m-%d")
+                last_sec = sec
+            line = f"{stamp} | {user} | {action}\n"
+            grouped[(user, date_str)].append(line.encode("utf-8"))
+        return grouped
+
+    def _close_handles(self):
+        for key in list(self._handles):
+            self._drop_handle(key)
+
+    def _write_batch(self, grouped):
+        """Prune if due, then enforce the size cap and write once per file."""
+        now = time.time()
+        if now - self._last_prune > PRUNE_INTERVAL:
+            self._last_prune = now
+            try:
+                self._prune_old_logs()
+            except OSError as e:
+                print(f"[ERROR] Log prune failed: {e}")
 
-    def _user_log_path(self, user: str) -> str:
-        date_str = datetime.now().strftime("%Y-%m-%d")
+        for (user, date_str), lines in grouped.items():
+            # A failure (bad user name, EACCES, ENOSPC…) only loses this group;
+            # the flusher thread must keep running for everyone else.
+            try:
+                self._write_group(user, date_str, lines)
+            except (OSError, ValueError) as e:
+                print(f"[ERROR] Failed to write {len(lines)} log line(s) for {user}: {e}")
+                self._drop_handle((user, date_str))
+
+    def _write_group(self, user: str, date_str: str, lines: list):
+        entry = self._handles.get((user, date_str))
+        if entry is None:
+            entry = self._open_handle(user, date_str)
+        size = entry[1]
+
+        # Warning
+        if size >= self.max_size * self.warning_threshold:
+            self._warn_size(user, size)
+
+        # Rotate if over cap
+        if size >= self.max_size:
+            entry[0].close()
+            self._rotate(self._user_log_path(user, date_str))
+            entry = self._open_handle(user, date_str)
+
+        entry[0].writelines(lines)
+        entry[0].flush()
+        entry[1] += sum(len(line) for line in lines)
+
+    def _drop_handle(self, key):
+        """Forget a handle after an error so the next batch reopens it."""
+        entry = self._handles.pop(key, None)
+        if entry is not None:
+            try:
+                entry[0].close()
+            except OSError:
+                pass
+
+    def _open_handle(self, user: str, date_str: str) -> list:
+        """Open (or reopen) the append handle for `user` on `date_str`."""
+        # Drop handles left over from previous days before opening today's
+        for key in [k for k in self._handles if k[1] != date_str]:
+            self._handles.pop(key)[0].close()
+
+        f = open(self._user_log_path(user, date_str), "ab", buffering=WRITE_BUFSIZE)
+        entry = [f, os.fstat(f.fileno()).st_size]
+        self._handles[(user, date_str)] = entry
+        return entry
+
+    def _user_log_path(self, user: str, date_str: str) -> str:
         filename = f"{user}_{date_str}.log"
         return os.path.join(self.log_dir, filename)
 
     def _prune_old_logs(self):
-        cutoff = datetime.now() - timedelta(days=self.retention_days)
-        for fname in os.listdir(self.log_dir):
-            try:
-                # Expect filenames like user_YYYY‑MM‑DD.log
-                date_part = fname.rsplit("_", 1)[1].rsplit(".",1)[0]
-                file_date = datetime.strptime(date_part, "%Y-%m-%d")
-            except Exception:
-                continue
-            if file_date < cutoff:
-                os.remove(os.path.join(self.log_dir, fname))
-                print(f"[PRUNE] Removed old log: {fname}")
+        cutoff_ts = (datetime.now() - timedelta(days=self.retention_days)).timestamp()
+        open_paths = {f.name for f, _ in self._handles.values()}
+        with os.scandir(self.log_dir) as it:
+            for entry in it:
+                if not _LOG_NAME_RE.match(entry.name):
+                    continue
+                if entry.path in open_paths:
+                    continue
+                # Last write time is what retention cares about; the name's date is redundant
+                try:
+                    if entry.stat().st_mtime >= cutoff_ts:
+                        continue
+                except FileNotFoundError:
+                    continue
+                os.remove(entry.path)
+                print(f"[PRUNE] Removed old log: {entry.name}")
 
     def _warn_size(self, user: str, size: int):
         gb = size / 1024**3
@@ -71,10 +195,8 @@ class Logger:
 
     def _rotate(self, path: str):
         rotated = path + ".1"
-        # remove previous rotated if exists
-        if os.path.exists(rotated):
-            os.remove(rotated)
-        os.rename(path, rotated)
+        # os.replace overwrites any previous rotated file in one syscall
+        os.replace(path, rotated)
         print(f"[ROTATE] Rotated log file: {os.path.basename(path)} → {os.path.basename(rotated)}")
 
 
@@ -88,6 +210,7 @@ if __name__ == "__main__":
         for u in users:
             lg.log(u, f"action_{i}")
         time.sleep(0.1)
+    lg.close()
 
     # Check that prune runs (we only keep today's files, but if you create older dated files in logs_test/)
     print("Done smoke test. Inspect logs_test/ for .log and .log.1 files.")
@@ -1,7 +1,11 @@
 
 import time
 import threading
-from datetime import datetime, timedelta
+from datetime import timedelta
+
+import numpy as np
+
+INITIAL_CAPACITY = 64  # session slots preallocated; doubles when full
 
 class SessionManager:
     """
@@ -11,67 +15,102 @@ class SessionManager:
     - check_interval: how often (in seconds) to scan sessions (default 300s = 5min)
     """
     def __init__(self, idle_timeout=3600, warning_before=300, check_interval=300):
-        self.idle_timeout = timedelta(seconds=idle_timeout)
-        self.warning_before = timedelta(seconds=warning_before)
+        self.idle_timeout_s = idle_timeout
+        self.warning_before_s = warning_before
         self.check_interval = check_interval
 
-        # session_id → last_activity timestamp
-        self._sessions = {}
+        # Parallel arrays: row i holds _ids[i] and its last activity
+        # (time.monotonic() seconds) in _last[i]; _idx maps id → row.
+        self._idx = {}
+        self._ids = []
+        self._last = np.empty(INITIAL_CAPACITY, dtype=np.float64)
         self._lock = threading.Lock()
-        self._running = False
+        self._stop = threading.Event()
         self._thread = None
 
     def start(self):
         """Begin background monitoring."""
-        if not self._running:
-            self._running = True
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
             self._thread = threading.Thread(target=self._monitor_loop, daemon=True)
             self._thread.start()
 
     def stop(self):
         """Stop background monitoring."""
-        self._running = False
+        self._stop.set()
         if self._thread:
             self._thread.join()
 
     def update_activity(self, session_id):
         """Call this whenever a user performs an action."""
         with self._lock:
-            self._sessions[session_id] = datetime.now()
+            i = self._idx.get(session_id)
+            if i is None:
+                i = len(self._ids)
+                if i == len(self._last):
+                    grown = np.empty(2 * len(self._last), dtype=np.float64)
+                    grown[:i] = self._last
+                    self._last = grown
+                self._idx[session_id] = i
+                self._ids.append(session_id)
+            self._last[i] = time.monotonic()
             # print(f"[DEBUG] Updated activity for session {session_id}")
 
     def remove_session(self, session_id):
         """Remove a session (e.g. on logout)."""
         with self._lock:
-            self._sessions.pop(session_id, None)
+            self._remove(session_id)
+
+    def _remove(self, session_id):
+        """Drop a session by moving the last row into its slot. Caller holds _lock."""
+        i = self._idx.pop(session_id, None)
+        if i is None:
+            return
+        tail = len(self._ids) - 1
+        if i != tail:
+            moved = self._ids[tail]
+            self._ids[i] = moved
+            self._last[i] = self._last[tail]
+            self._idx[moved] = i
+        self._ids.pop()
 
     def _monitor_loop(self):
         """Background thread: warn and disconnect idle sessions."""
-        while self._running:
-            now = datetime.now()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            # Only the vectorised scan runs under the lock; side effects run after
             with self._lock:
-                for session_id, last in list(self._sessions.items()):
-                    idle = now - last
-
-                    # Issue warning if within warning window
-                    if idle >= (self.idle_timeout - self.warning_before) and idle < self.idle_timeout:
-                        self._warn(session_id, idle)
-
-                    # Disconnect if fully timed out
-                    if idle >= self.idle_timeout:
-                        self._disconnect(session_id)
-
-            time.sleep(self.check_interval)
-
-    def _warn(self, session_id, idle_time):
+                idle = now - self._last[:len(self._ids)]
+                dc_mask = idle >= self.idle_timeout_s
+                warn_mask = (idle >= self.idle_timeout_s - self.warning_before_s) & ~dc_mask
+                to_warn = [(self._ids[i], idle[i]) for i in np.flatnonzero(warn_mask)]
+                to_dc = [self._ids[i] for i in np.flatnonzero(dc_mask)]
+
+            # Issue warning if within warning window
+            for session_id, idle_s in to_warn:
+                self._warn(session_id, idle_s)
+
+            # Disconnect if fully timed out
+            for session_id in to_dc:
+                with self._lock:
+                    # Re-check: the session may have been refreshed or removed since the scan
+                    i = self._idx.get(session_id)
+                    if i is None or time.monotonic() - self._last[i] < self.idle_timeout_s:
+                        continue
+                    self._remove(session_id)
+                self._disconnect(session_id)
+
+            if self._stop.wait(self.check_interval):
+                break
+
+    def _warn(self, session_id, idle_s):
         # TODO: hook into your alerting system instead of print()
-        print(f"[WARNING] Session '{session_id}' idle for {idle_time}. "
-              f"Will disconnect in {(self.idle_timeout - idle_time)}.")
+        print(f"[WARNING] Session '{session_id}' idle for {timedelta(seconds=int(idle_s))}. "
+              f"Will disconnect in {timedelta(seconds=int(self.idle_timeout_s - idle_s))}.")
 
     def _disconnect(self, session_id):
         # TODO: replace with actual disconnect logic (e.g. terminate socket)
-        print(f"[DISCONNECT] Session '{session_id}' disconnected after {self.idle_timeout} of inactivity.")
-        self._sessions.pop(session_id, None)
+        print(f"[DISCONNECT] Session '{session_id}' disconnected after {timedelta(seconds=self.idle_timeout_s)} of inactivity.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+import errno
+import os
+import sys
+import tarfile
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "core"))
+
+import backup_manager  # noqa: E402
+from backup_manager import BackupManager, DIFF_SUFFIX, LAST_BACKUP_FILE  # noqa: E402
+
+
+class BackupManagerTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self._tmp.name, "logs")
+        self.dst = os.path.join(self._tmp.name, "backups")
+        # Exercise the in-process tarfile path regardless of pigz on the host
+        patcher = mock.patch.object(backup_manager.shutil, "which", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self._tmp.cleanup)
+        self.bm = BackupManager(source_dir=self.src, backup_dir=self.dst,
+                                retention_days=1, full_backup_every=3)
+
+    def _write(self, name, data="entry\n", mtime=None):
+        path = os.path.join(self.src, name)
+        with open(path, "w") as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def _archives(self):
+        return sorted(n for n in os.listdir(self.dst) if n.startswith("backup-"))
+
+    def _last_backup(self):
+        with open(os.path.join(self.dst, LAST_BACKUP_FILE)) as f:
+            return f.read()
+
+    def test_full_diff_prune_with_failed_full(self):
+        now = time.time()
+        self._write("a.log", mtime=now - 60)
+
+        # Run 1: full
+        self.bm.backup_once()
+        [full] = self._archives()
+        self.assertFalse(full.endswith(DIFF_SUFFIX + ".tar.gz"))
+        with tarfile.open(os.path.join(self.dst, full)) as tar:
+            self.assertIn("logs/a.log", tar.getnames())
+
+        # Age the full past retention (and off the current second's name)
+        old_full = "backup-20000101-000000.tar.gz"
+        old_path = os.path.join(self.dst, old_full)
+        os.rename(os.path.join(self.dst, full), old_path)
+        os.utime(old_path, (now - 10 * 86400, now - 10 * 86400))
+        last_backup = self._last_backup()
+
+        # Run 2: differential holds only what changed since the full
+        self._write("b.log", mtime=now)
+        self.bm.backup_once()
+        [diff] = [n for n in self._archives() if n != old_full]
+        self.assertTrue(diff.endswith(DIFF_SUFFIX + ".tar.gz"))
+        with tarfile.open(os.path.join(self.dst, diff)) as tar:
+            self.assertEqual(tar.getnames(), ["logs/b.log"])
+        os.rename(os.path.join(self.dst, diff),
+                  os.path.join(self.dst, "backup-20000101-000001-diff.tar.gz"))
+
+        # Run 3: full that fails mid-write (e.g. disk full)
+        self.bm._runs = 3
+        before = self._archives()
+        with mock.patch.object(tarfile.TarFile, "add",
+                               side_effect=OSError(errno.ENOSPC, "No space left on device")):
+            with self.assertRaises(OSError):
+                self.bm.backup_once()
+
+        # No partial archive left behind, and the last full stays the reference
+        self.assertEqual(self._archives(), before)
+        self.assertEqual(self._last_backup(), last_backup)
+
+        # Pruning never removes the newest (only) full, however old it is
+        self.bm._prune_old_backups()
+        self.assertIn(old_full, self._archives())
+
+
+if __name__ == "__main__":
+    unittest.main()